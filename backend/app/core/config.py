@@ -1,5 +1,7 @@
+from pydantic import Field
 from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Optional
 import os
 
 # Determine the environment
@@ -43,6 +45,18 @@ class Settings(BaseSettings):
     TRAINING_CSV_PATH: str = str(DATA_DIR / "training.csv")
     SYMPTOM_SEVERITY_CSV_PATH: str = str(DATA_DIR / "Symptom_Severity.csv")
     
+    # Ensemble settings - extra model files voting alongside MODEL_PATH
+    ENSEMBLE_MODEL_PATHS: list[str] = []
+    ENSEMBLE_LATENCY_BUDGET_MS: float = 200.0
+    ENSEMBLE_MAX_LATENCY_BUDGET_MS: float = 2000.0
+    ENSEMBLE_SLOTS_PER_MEMBER: int = os.cpu_count() or 4
+    
+    # Shadow evaluation settings - candidate model scored off the request path
+    SHADOW_MODEL_PATH: Optional[str] = None
+    SHADOW_SAMPLE_RATE: float = 0.1
+    SHADOW_QUEUE_SIZE: int = Field(1000, ge=1)
+    SHADOW_MAX_EXAMPLES: int = 50
+    
     # CORS settings
     BACKEND_CORS_ORIGINS: list[str] = ["*"]
     
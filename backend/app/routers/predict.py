@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from ..core.config import settings
 from ..services.model_service import ModelService
 
 router = APIRouter(
@@ -19,6 +21,61 @@ class DiseasePredictionResponse(BaseModel):
     prediction: str
     details: Dict[str, Any]
 
+class EnsembleInput(BaseModel):
+    symptoms: List[str]
+    latency_budget_ms: Optional[float] = Field(None, gt=0, le=settings.ENSEMBLE_MAX_LATENCY_BUDGET_MS)
+
+class EnsembleSummary(BaseModel):
+    members: List[str]
+    contributors: List[str]
+    dropped: List[str]
+    skipped: List[str]
+    failed: List[str]
+    votes: Dict[str, str]
+    agreement: float
+    latency_budget_ms: float
+
+class EnsemblePredictionResponse(BaseModel):
+    prediction: str
+    details: Dict[str, Any]
+    ensemble: EnsembleSummary
+
+class AskNextInput(BaseModel):
+    symptoms: List[str]
+    top_k: int = Field(5, ge=1, le=50)
+
+class SymptomSuggestion(BaseModel):
+    symptom: str
+    score: float
+    cooccurrence: int
+
+class CandidateDisease(BaseModel):
+    disease: str
+    probability: float
+
+class AskNextResponse(BaseModel):
+    symptoms: List[str]
+    suggestions: List[SymptomSuggestion]
+    candidate_diseases: List[CandidateDisease]
+
+class ShadowLatency(BaseModel):
+    mean_ms: Optional[float]
+    p50_ms: Optional[float]
+    p95_ms: Optional[float]
+    p99_ms: Optional[float]
+    max_ms: Optional[float]
+
+class ShadowStatsResponse(BaseModel):
+    sample_rate: float
+    submitted: int
+    dropped: int
+    evaluated: int
+    failed: int
+    queued: int
+    agreement_rate: Optional[float]
+    disagreements: List[Dict[str, Any]]
+    latency: ShadowLatency
+
 class SymptomListResponse(BaseModel):
     symptoms: List[Dict[str, Any]]
 
@@ -38,8 +95,12 @@ class SymptomSeverityResponse(BaseModel):
     weight: int
     description: str
 
+class MemoryUsageResponse(BaseModel):
+    structures: Dict[str, int]
+    total_bytes: int
+
 @router.post("/", response_model=DiseasePredictionResponse)
-async def predict_disease(symptom_input: SymptomInput) -> Dict[str, Any]:
+async def predict_disease(symptom_input: SymptomInput, background_tasks: BackgroundTasks) -> Dict[str, Any]:
     """
     Predict disease based on symptoms
     
@@ -53,7 +114,12 @@ async def predict_disease(symptom_input: SymptomInput) -> Dict[str, Any]:
     ```
     """
     try:
-        return model_service.predict_disease(symptom_input.symptoms)
+        result = model_service.predict_disease(symptom_input.symptoms)
+        # Runs after the response is sent, so shadow work adds no user latency;
+        # unsampled requests skip the background task altogether
+        if model_service.should_shadow():
+            background_tasks.add_task(model_service.submit_shadow, symptom_input.symptoms, result['prediction'])
+        return result
     except HTTPException:
         raise
     except Exception as e:
@@ -62,6 +128,64 @@ async def predict_disease(symptom_input: SymptomInput) -> Dict[str, Any]:
             detail=f"Prediction failed: {str(e)}"
         )
 
+@router.post("/ensemble", response_model=EnsemblePredictionResponse)
+async def predict_disease_ensemble(ensemble_input: EnsembleInput) -> Dict[str, Any]:
+    """
+    Predict disease by majority vote of the configured ensemble models
+    
+    - **symptoms**: List of symptoms to predict the disease
+    - **latency_budget_ms**: Optional per-request budget, at most `ENSEMBLE_MAX_LATENCY_BUDGET_MS`; members slower than this are dropped
+    
+    The `ensemble` field of the response lists which members contributed a vote.
+    
+    Example request body:
+    ```json
+    {
+        "symptoms": ["fever", "headache", "nausea"],
+        "latency_budget_ms": 150
+    }
+    ```
+    """
+    try:
+        return await run_in_threadpool(
+            model_service.predict_disease_ensemble,
+            ensemble_input.symptoms,
+            ensemble_input.latency_budget_ms
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ensemble prediction failed: {str(e)}"
+        )
+
+@router.post("/ask-next", response_model=AskNextResponse)
+async def suggest_next_symptoms(ask_next_input: AskNextInput) -> Dict[str, Any]:
+    """
+    Suggest the most informative symptoms to ask about next
+    
+    - **symptoms**: Symptoms reported so far (may be empty)
+    - **top_k**: Maximum number of suggestions to return
+    
+    Example request body:
+    ```json
+    {
+        "symptoms": ["itching", "skin rash"],
+        "top_k": 5
+    }
+    ```
+    """
+    try:
+        return model_service.suggest_next_symptoms(ask_next_input.symptoms, ask_next_input.top_k)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to suggest symptoms: {str(e)}"
+        )
+
 @router.get("/symptoms", response_model=SymptomListResponse)
 async def get_symptoms() -> Dict[str, List[Dict[str, Any]]]:
     """
@@ -152,6 +276,47 @@ async def get_symptom_severity(symptom: str):
             detail=f"Failed to fetch symptom severity: {str(e)}"
         )
 
+@router.get("/diagnostics/memory", response_model=MemoryUsageResponse)
+async def get_memory_usage() -> Dict[str, Any]:
+    """
+    Get the approximate bytes held by each structure the model service keeps in memory
+    
+    Returns the bytes per structure and their total in the format:
+    ```json
+    {
+        "structures": {"model": 1024, "disease_records": 2048},
+        "total_bytes": 3072
+    }
+    ```
+    """
+    try:
+        structures = model_service.get_memory_usage()
+        return {"structures": structures, "total_bytes": sum(structures.values())}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to compute memory usage: {str(e)}"
+        )
+
+@router.get("/shadow/stats", response_model=ShadowStatsResponse)
+async def get_shadow_stats() -> Dict[str, Any]:
+    """
+    Get how the shadow candidate model compares with the primary model on live traffic
+    
+    Returns the agreement rate, recent disagreement examples, the candidate's
+    latency distribution and how many sampled requests were dropped because
+    the shadow queue was full.
+    """
+    try:
+        return model_service.get_shadow_stats()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch shadow stats: {str(e)}"
+        )
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint for the prediction service"""
@@ -2,33 +2,82 @@ import pandas as pd
 import numpy as np
 import joblib
 import os
+import sys
+import threading
+import time
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from fastapi import HTTPException
 from ..core.config import settings
+from .shadow_service import ShadowEvaluator
 import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """Approximate the bytes held by an object and everything it references"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        # Owning arrays already report their buffer; views hold on to their base
+        if obj.base is None:
+            return sys.getsizeof(obj)
+        return sys.getsizeof(obj) + _deep_sizeof(obj.base, seen)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__slots__'):
+        size += sum(_deep_sizeof(getattr(obj, slot), seen)
+                    for slot in obj.__slots__ if hasattr(obj, slot))
+    elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+        size += _deep_sizeof(vars(obj), seen)
+    return size
+
+def _binary_entropy(p: np.ndarray) -> np.ndarray:
+    """Entropy in bits of Bernoulli(p), taking 0 * log(0) as 0"""
+    q = 1 - p
+    return -(p * np.log2(np.where(p > 0, p, 1)) + q * np.log2(np.where(q > 0, q, 1)))
+
+class DiseaseRecord:
+    """Everything served about one disease, kept as immutable tuples"""
+    __slots__ = ('description', 'precautions', 'medications', 'diets', 'workouts')
+
+    def __init__(self, description: str = "No description available.",
+                 precautions: tuple = (), medications: tuple = (),
+                 diets: tuple = (), workouts: tuple = ()):
+        self.description = description
+        self.precautions = precautions
+        self.medications = medications
+        self.diets = diets
+        self.workouts = workouts
+
 class ModelService:
     def __init__(self):
         self.model = None
         self.symptoms_dict = {}
         self.diseases_list = {}
-        self.symptoms_df = None
-        self.precautions_df = None
-        self.workout_df = None
-        self.description_df = None
-        self.medications_df = None
-        self.diets_df = None
-        self.training_df = None
-        self.symptom_severity_df = None
+        self.disease_records = {}
+        self.disease_symptom_freq = None
+        self.disease_symptom_entropy = None
+        self.symptom_cooccurrence = None
+        self.symptom_severity = {}
+        self.ensemble_models = {}
+        self._ensemble_executor = None
+        self._ensemble_slots = {}
+        self.shadow = None
         self._load_models()
+        self._load_ensemble()
         self._load_data()
-        self._initialize_symptoms_dict()
-        self._initialize_diseases_list()
+        self._load_shadow()
 
     def _load_models(self):
         """Load the trained ML model"""
@@ -46,8 +95,61 @@ class ModelService:
                 detail=f"Failed to load the model: {str(e)}"
             )
 
+    def _load_ensemble(self):
+        """Load the optional ensemble members and their worker pool"""
+        if not settings.ENSEMBLE_MODEL_PATHS:
+            return
+        try:
+            # The primary model always votes first so it wins ties
+            self.ensemble_models[Path(settings.MODEL_PATH).stem] = self.model
+            for model_path in settings.ENSEMBLE_MODEL_PATHS:
+                name = Path(model_path).stem
+                if name in self.ensemble_models:
+                    name = f"{name}_{len(self.ensemble_models)}"
+                logger.info(f"Loading ensemble member '{name}' from: {model_path}")
+                if not os.path.exists(model_path):
+                    raise FileNotFoundError(f"Model file not found at {model_path}")
+                self.ensemble_models[name] = joblib.load(model_path)
+                self._ensemble_slots[name] = threading.BoundedSemaphore(settings.ENSEMBLE_SLOTS_PER_MEMBER)
+            # One worker per slot, so a member that holds a slot never queues
+            self._ensemble_executor = ThreadPoolExecutor(
+                max_workers=settings.ENSEMBLE_SLOTS_PER_MEMBER * len(self._ensemble_slots),
+                thread_name_prefix="ensemble"
+            )
+            logger.info(f"Ensemble ready with members: {list(self.ensemble_models)}")
+        except Exception as e:
+            logger.error(f"Failed to load ensemble: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to load the ensemble models: {str(e)}"
+            )
+
+    def _load_shadow(self):
+        """Load the optional candidate model and start its shadow evaluator"""
+        if not settings.SHADOW_MODEL_PATH:
+            return
+        try:
+            model_path = settings.SHADOW_MODEL_PATH
+            logger.info(f"Loading shadow candidate model from: {model_path}")
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"Model file not found at {model_path}")
+            self.shadow = ShadowEvaluator(
+                model=joblib.load(model_path),
+                diseases_list=self.diseases_list,
+                sample_rate=settings.SHADOW_SAMPLE_RATE,
+                queue_size=settings.SHADOW_QUEUE_SIZE,
+                max_examples=settings.SHADOW_MAX_EXAMPLES
+            )
+            logger.info(f"Shadow evaluation enabled at sample rate {settings.SHADOW_SAMPLE_RATE}")
+        except Exception as e:
+            logger.error(f"Failed to load shadow model: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to load the shadow model: {str(e)}"
+            )
+
     def _load_data(self):
-        """Load all required data files"""
+        """Load all required data files into compact lookup structures"""
         try:
             logger.info("Loading data files...")
             data_dir = settings.DATA_DIR
@@ -60,15 +162,22 @@ class ModelService:
             # List files in the data directory for debugging
             logger.info(f"Files in data directory: {os.listdir(data_dir)}")
             
-            # Load data files
-            self.symptoms_df = pd.read_csv(data_dir / "symptoms_df.csv")
-            self.precautions_df = pd.read_csv(data_dir / "Precautions_df.csv")
-            self.workout_df = pd.read_csv(data_dir / "workout_df.csv")
-            self.description_df = pd.read_csv(data_dir / "Description.csv")
-            self.medications_df = pd.read_csv(data_dir / "Medications.csv")
-            self.diets_df = pd.read_csv(data_dir / "Diets.csv")
-            self.training_df = pd.read_csv(data_dir / "training.csv")
-            self.symptom_severity_df = pd.read_csv(data_dir / "Symptom_Severity.csv")
+            # The source frames are only needed while building the lookup
+            # structures and are released when this method returns
+            training_df = pd.read_csv(data_dir / "training.csv")
+            self._initialize_symptoms_dict(training_df)
+            self._initialize_diseases_list(training_df)
+            self._initialize_symptom_statistics(training_df)
+            del training_df
+            
+            self._initialize_disease_records(
+                description_df=pd.read_csv(data_dir / "Description.csv"),
+                precautions_df=pd.read_csv(data_dir / "Precautions_df.csv"),
+                medications_df=pd.read_csv(data_dir / "Medications.csv"),
+                diets_df=pd.read_csv(data_dir / "Diets.csv"),
+                workout_df=pd.read_csv(data_dir / "workout_df.csv")
+            )
+            self._initialize_symptom_severity(pd.read_csv(data_dir / "Symptom_Severity.csv"))
             
         except Exception as e:
             raise HTTPException(
@@ -76,46 +185,78 @@ class ModelService:
                 detail=f"Failed to load data files: {str(e)}"
             )
 
-    def _initialize_symptoms_dict(self):
+    def _initialize_symptoms_dict(self, training_df: pd.DataFrame):
         """Initialize the symptoms dictionary"""
-        symptoms = [col.replace('_', ' ') for col in self.training_df.columns[:-1]]
+        symptoms = [col.replace('_', ' ') for col in training_df.columns[:-1]]
         self.symptoms_dict = {symptom: idx for idx, symptom in enumerate(symptoms)}
 
-    def _initialize_diseases_list(self):
+    def _initialize_diseases_list(self, training_df: pd.DataFrame):
         """Initialize the diseases list"""
-        diseases = self.training_df['prognosis'].unique()
-        self.diseases_list = {idx: disease for idx, disease in enumerate(diseases)}
+        diseases = training_df['prognosis'].unique()
+        self.diseases_list = {idx: str(disease) for idx, disease in enumerate(diseases)}
+
+    def _initialize_symptom_statistics(self, training_df: pd.DataFrame):
+        """Precompute per-disease symptom frequencies, their entropies and symptom co-occurrence counts"""
+        features = training_df.iloc[:, :-1].to_numpy(dtype=np.uint16)
+        prognosis = training_df['prognosis'].to_numpy()
+        freq = np.zeros((len(self.diseases_list), features.shape[1]), dtype=np.float64)
+        for idx, disease in self.diseases_list.items():
+            freq[idx] = features[prognosis == disease].mean(axis=0)
+        self.disease_symptom_freq = freq
+        self.disease_symptom_entropy = _binary_entropy(freq)
+        cooccurrence = features.T.astype(np.uint32) @ features.astype(np.uint32)
+        self.symptom_cooccurrence = cooccurrence.astype(np.min_scalar_type(cooccurrence.max()))
+
+    def _initialize_disease_records(self, description_df: pd.DataFrame,
+                                    precautions_df: pd.DataFrame,
+                                    medications_df: pd.DataFrame,
+                                    diets_df: pd.DataFrame,
+                                    workout_df: pd.DataFrame):
+        """Build one DiseaseRecord per disease from the info tables"""
+        descriptions = description_df.drop_duplicates('Disease').set_index('Disease')['Description']
+        precaution_cols = [f'Precaution_{i+1}' for i in range(4)]
+        precautions = precautions_df.drop_duplicates('Disease').set_index('Disease')[precaution_cols]
+        medications = medications_df.groupby('Disease')['Medication'].agg(tuple)
+        diets = diets_df.groupby('Disease')['Diet'].agg(tuple)
+        workouts = workout_df.groupby('disease')['workout'].agg(tuple)
+        
+        names = set(descriptions.index) | set(precautions.index) | set(medications.index) \
+            | set(diets.index) | set(workouts.index)
+        self.disease_records = {
+            name: DiseaseRecord(
+                description=descriptions.get(name, "No description available."),
+                precautions=tuple(p for p in precautions.loc[name] if pd.notna(p) and p)
+                    if name in precautions.index else (),
+                medications=medications.get(name, ()),
+                diets=diets.get(name, ()),
+                workouts=workouts.get(name, ())
+            )
+            for name in names
+        }
+
+    def _initialize_symptom_severity(self, symptom_severity_df: pd.DataFrame):
+        """Map each symptom to its (weight, description) pair"""
+        severity_df = symptom_severity_df.drop_duplicates('Symptom')
+        descriptions = severity_df['description'] if 'description' in severity_df \
+            else [""] * len(severity_df)
+        self.symptom_severity = {
+            symptom: (int(weight), description)
+            for symptom, weight, description in zip(
+                severity_df['Symptom'], severity_df['weight'], descriptions
+            )
+        }
 
     def get_disease_info(self, disease_name: str) -> Dict[str, Any]:
         """Get detailed information about a disease"""
         try:
-            # Get description
-            desc = self.description_df[self.description_df['Disease'] == disease_name]['Description']
-            description = desc.values[0] if not desc.empty else "No description available."
-            
-            # Get precautions
-            prec = self.precautions_df[self.precautions_df['Disease'] == disease_name].iloc[0] \
-                if not self.precautions_df[self.precautions_df['Disease'] == disease_name].empty else {}
-            precautions = [prec.get(f'Precaution_{i+1}') for i in range(4) if prec.get(f'Precaution_{i+1}')]
-            
-            # Get medications
-            meds = self.medications_df[self.medications_df['Disease'] == disease_name]['Medication']
-            medications = meds.values.tolist() if not meds.empty else []
-            
-            # Get diets
-            diet = self.diets_df[self.diets_df['Disease'] == disease_name]['Diet']
-            diets = diet.values.tolist() if not diet.empty else []
-            
-            # Get workouts
-            workouts = self.workout_df[self.workout_df['disease'] == disease_name]['workout'].values.tolist()
-            
+            record = self.disease_records.get(disease_name) or DiseaseRecord()
             return {
                 'disease': disease_name,
-                'description': description,
-                'precautions': precautions,
-                'medications': medications,
-                'diets': diets,
-                'workouts': workouts
+                'description': record.description,
+                'precautions': list(record.precautions),
+                'medications': list(record.medications),
+                'diets': list(record.diets),
+                'workouts': list(record.workouts)
             }
             
         except Exception as e:
@@ -124,21 +265,28 @@ class ModelService:
                 detail=f"Error getting disease info: {str(e)}"
             )
 
+    def _validate_symptoms(self, symptoms: List[str]):
+        """Reject symptoms that are not part of the model vocabulary"""
+        invalid_symptoms = [s for s in symptoms if s not in self.symptoms_dict]
+        if invalid_symptoms:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid symptoms: {', '.join(invalid_symptoms)}. Use /symptoms to get valid symptoms."
+            )
+
+    def _build_input_vector(self, symptoms: List[str]) -> np.ndarray:
+        """Validate symptoms and encode them as a model input vector"""
+        self._validate_symptoms(symptoms)
+        
+        input_vector = np.zeros(len(self.symptoms_dict))
+        for symptom in symptoms:
+            input_vector[self.symptoms_dict[symptom]] = 1
+        return input_vector
+
     def predict_disease(self, symptoms: List[str]) -> Dict[str, Any]:
         """Predict disease based on symptoms"""
         try:
-            # Validate input symptoms
-            invalid_symptoms = [s for s in symptoms if s not in self.symptoms_dict]
-            if invalid_symptoms:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid symptoms: {', '.join(invalid_symptoms)}. Use /symptoms to get valid symptoms."
-                )
-            
-            # Create input vector
-            input_vector = np.zeros(len(self.symptoms_dict))
-            for symptom in symptoms:
-                input_vector[self.symptoms_dict[symptom]] = 1
+            input_vector = self._build_input_vector(symptoms)
             
             # Make prediction
             prediction_idx = self.model.predict([input_vector])[0]
@@ -160,6 +308,184 @@ class ModelService:
                 detail=f"Prediction error: {str(e)}"
             )
     
+    def should_shadow(self) -> bool:
+        """Decide whether the current prediction is copied to the shadow candidate"""
+        return self.shadow is not None and self.shadow.should_sample()
+
+    def submit_shadow(self, symptoms: List[str], primary_prediction: str):
+        """Queue a sampled prediction for the shadow candidate"""
+        try:
+            self.shadow.submit(symptoms, self._build_input_vector(symptoms), primary_prediction)
+        except Exception as e:
+            logger.warning(f"Failed to submit shadow evaluation: {str(e)}")
+
+    def get_shadow_stats(self) -> Dict[str, Any]:
+        """Get the shadow candidate's agreement and latency statistics"""
+        if self.shadow is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Shadow evaluation is not configured. Set SHADOW_MODEL_PATH to enable it."
+            )
+        return self.shadow.get_stats()
+
+    def _run_ensemble_member(self, name: str, model: Any, input_vector: np.ndarray):
+        """Run one ensemble member and free its in-flight slot when done"""
+        try:
+            return model.predict([input_vector])[0]
+        finally:
+            self._ensemble_slots[name].release()
+
+    def predict_disease_ensemble(self, symptoms: List[str],
+                                 latency_budget_ms: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Predict disease by majority vote of the ensemble members
+        
+        The primary model votes inline, so a prediction is always available.
+        The other members run in parallel on the ensemble worker pool and are
+        dropped from the vote if they miss the latency budget. Each member has
+        a bounded number of in-flight slots; a member whose slots stay taken
+        until the deadline is skipped, so slow members cannot pile up
+        abandoned work.
+        """
+        if not self.ensemble_models:
+            raise HTTPException(
+                status_code=503,
+                detail="Ensemble mode is not configured. Set ENSEMBLE_MODEL_PATHS to enable it."
+            )
+        try:
+            input_vector = self._build_input_vector(symptoms)
+            budget_ms = settings.ENSEMBLE_LATENCY_BUDGET_MS if latency_budget_ms is None else latency_budget_ms
+            budget_s = min(budget_ms, settings.ENSEMBLE_MAX_LATENCY_BUDGET_MS) / 1000
+            primary_name = next(iter(self.ensemble_models))
+            deadline = time.perf_counter() + budget_s
+            futures, waiting, skipped = {}, [], []
+            
+            def submit(name: str):
+                try:
+                    futures[name] = self._ensemble_executor.submit(
+                        self._run_ensemble_member, name, self.ensemble_models[name], input_vector)
+                except Exception:
+                    self._ensemble_slots[name].release()
+                    raise
+            
+            # Start every member with a free slot right away
+            for name, slots in self._ensemble_slots.items():
+                if slots.acquire(blocking=False):
+                    submit(name)
+                else:
+                    waiting.append(name)
+            
+            votes = {primary_name: self.model.predict([input_vector])[0]}
+            
+            # Busy members get until the deadline for one of their slots to free up
+            for name in waiting:
+                if self._ensemble_slots[name].acquire(timeout=max(0.0, deadline - time.perf_counter())):
+                    submit(name)
+                else:
+                    skipped.append(name)
+            
+            # Collect votes in member order so ties resolve deterministically
+            dropped, failed = [], []
+            for name in self._ensemble_slots:
+                if name not in futures:
+                    continue
+                future = futures[name]
+                try:
+                    votes[name] = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+                except FuturesTimeoutError:
+                    dropped.append(name)
+                except Exception as e:
+                    logger.warning(f"Ensemble member '{name}' failed: {str(e)}")
+                    failed.append(name)
+            
+            prediction_idx, vote_count = Counter(votes.values()).most_common(1)[0]
+            disease_name = self.diseases_list.get(prediction_idx, "Unknown Disease")
+            
+            return {
+                'prediction': disease_name,
+                'details': self.get_disease_info(disease_name),
+                'ensemble': {
+                    'members': list(self.ensemble_models),
+                    'contributors': list(votes),
+                    'dropped': dropped,
+                    'skipped': skipped,
+                    'failed': failed,
+                    'votes': {
+                        name: self.diseases_list.get(idx, "Unknown Disease")
+                        for name, idx in votes.items()
+                    },
+                    'agreement': vote_count / len(votes),
+                    'latency_budget_ms': budget_s * 1000
+                }
+            }
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Ensemble prediction error: {str(e)}"
+            )
+    
+    def suggest_next_symptoms(self, symptoms: List[str], top_k: int = 5) -> Dict[str, Any]:
+        """
+        Suggest the most informative symptoms to ask about next
+        
+        Candidate diseases are weighted by how well their symptom profiles
+        explain the reported symptoms. Each unreported symptom that has
+        co-occurred with a reported one is scored by its expected information
+        gain about the disease: the entropy of its presence across the
+        candidates minus the weighted entropy within each candidate.
+        """
+        try:
+            self._validate_symptoms(symptoms)
+            reported = np.unique([self.symptoms_dict[s] for s in symptoms]).astype(np.intp)
+            freq = self.disease_symptom_freq
+            
+            # Smoothed likelihood of the reported symptoms under each disease
+            weights = np.prod(freq[:, reported] + 0.01, axis=1)
+            weights /= weights.sum()
+            
+            # Expected information gain of asking about each symptom
+            scores = _binary_entropy(weights @ freq) - weights @ self.disease_symptom_entropy
+            
+            # With nothing reported yet the diagonal holds each symptom's own count
+            cooccurrence = self.symptom_cooccurrence[reported].sum(axis=0) if reported.size \
+                else np.diag(self.symptom_cooccurrence)
+            scores[cooccurrence == 0] = 0
+            scores[reported] = 0
+            
+            symptom_names = list(self.symptoms_dict)
+            ranked = [idx for idx in np.argsort(-scores, kind='stable')[:top_k] if scores[idx] > 1e-6]
+            top_diseases = np.argsort(-weights, kind='stable')[:5]
+            
+            return {
+                'symptoms': symptoms,
+                'suggestions': [
+                    {
+                        'symptom': symptom_names[idx],
+                        'score': float(scores[idx]),
+                        'cooccurrence': int(cooccurrence[idx])
+                    }
+                    for idx in ranked
+                ],
+                'candidate_diseases': [
+                    {
+                        'disease': self.diseases_list[idx],
+                        'probability': float(weights[idx])
+                    }
+                    for idx in top_diseases
+                ]
+            }
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error suggesting symptoms: {str(e)}"
+            )
+    
     def get_available_symptoms(self) -> List[Dict[str, Any]]:
         """Get list of all available symptoms with their IDs"""
         return [{"id": idx, "name": name} for name, idx in self.symptoms_dict.items()]
@@ -171,16 +497,40 @@ class ModelService:
     def get_symptom_severity(self, symptom: str) -> Optional[Dict[str, Any]]:
         """Get severity information for a specific symptom"""
         try:
-            severity = self.symptom_severity_df[self.symptom_severity_df['Symptom'] == symptom]
-            if not severity.empty:
+            severity = self.symptom_severity.get(symptom)
+            if severity is not None:
+                weight, description = severity
                 return {
                     'symptom': symptom,
-                    'weight': int(severity['weight'].iloc[0]),
-                    'description': severity['description'].iloc[0]
+                    'weight': weight,
+                    'description': description
                 }
             return None
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Error getting symptom severity: {str(e)}"
-            )
\ No newline at end of file
+            )
+
+    def get_memory_usage(self) -> Dict[str, int]:
+        """
+        Get the approximate bytes held by each long-lived structure
+        
+        Structures are measured in a fixed order and objects shared between
+        them are attributed to the first one only, so the figures add up to
+        the total held.
+        """
+        structures = {
+            'model': self.model,
+            'ensemble_models': self.ensemble_models,
+            'symptoms_dict': self.symptoms_dict,
+            'diseases_list': self.diseases_list,
+            'disease_records': self.disease_records,
+            'disease_symptom_freq': self.disease_symptom_freq,
+            'disease_symptom_entropy': self.disease_symptom_entropy,
+            'symptom_cooccurrence': self.symptom_cooccurrence,
+            'symptom_severity': self.symptom_severity,
+            'shadow_model': self.shadow.model if self.shadow else None
+        }
+        seen = set()
+        return {name: _deep_sizeof(value, seen) for name, value in structures.items()}
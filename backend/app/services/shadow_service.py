@@ -0,0 +1,109 @@
+import numpy as np
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ShadowEvaluator:
+    """
+    Evaluates a candidate model on a sample of live predictions
+
+    Work is handed over through a bounded queue and scored on a background
+    thread. When the queue is full the shadow request is dropped, so the
+    primary path never waits on the candidate.
+    """
+
+    def __init__(self, model: Any, diseases_list: Dict[int, str], sample_rate: float,
+                 queue_size: int, max_examples: int, max_latencies: int = 10000):
+        # queue.Queue treats a size below 1 as unbounded
+        if queue_size < 1:
+            raise ValueError(f"Shadow queue size must be at least 1, got {queue_size}")
+        self.model = model
+        self.diseases_list = diseases_list
+        self.sample_rate = sample_rate
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._dropped = 0
+        self._evaluated = 0
+        self._agreements = 0
+        self._failed = 0
+        self._disagreements = deque(maxlen=max_examples)
+        self._latencies_ms = deque(maxlen=max_latencies)
+        self._worker = threading.Thread(target=self._run, name="shadow-evaluator", daemon=True)
+        self._worker.start()
+
+    def should_sample(self) -> bool:
+        """Decide whether the current request is copied to the candidate"""
+        return random.random() < self.sample_rate
+
+    def submit(self, symptoms: List[str], input_vector: np.ndarray, primary_prediction: str):
+        """Queue a shadow evaluation without blocking, dropping it if the queue is full"""
+        try:
+            self._queue.put_nowait((symptoms, input_vector, primary_prediction))
+            with self._lock:
+                self._submitted += 1
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+
+    def _run(self):
+        """Score queued requests against the candidate model until the process exits"""
+        while True:
+            symptoms, input_vector, primary_prediction = self._queue.get()
+            try:
+                started = time.perf_counter()
+                prediction_idx = self.model.predict([input_vector])[0]
+                latency_ms = (time.perf_counter() - started) * 1000
+                candidate_prediction = self.diseases_list.get(prediction_idx, "Unknown Disease")
+                with self._lock:
+                    self._evaluated += 1
+                    self._latencies_ms.append(latency_ms)
+                    if candidate_prediction == primary_prediction:
+                        self._agreements += 1
+                    else:
+                        self._disagreements.append({
+                            'symptoms': symptoms,
+                            'primary': primary_prediction,
+                            'candidate': candidate_prediction
+                        })
+            except Exception as e:
+                logger.warning(f"Shadow evaluation failed: {str(e)}")
+                with self._lock:
+                    self._failed += 1
+            finally:
+                self._queue.task_done()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get agreement, queue and latency statistics for the candidate"""
+        with self._lock:
+            latencies = np.array(self._latencies_ms)
+            evaluated = self._evaluated
+            stats = {
+                'sample_rate': self.sample_rate,
+                'submitted': self._submitted,
+                'dropped': self._dropped,
+                'evaluated': evaluated,
+                'failed': self._failed,
+                'queued': self._queue.qsize(),
+                'agreement_rate': self._agreements / evaluated if evaluated else None,
+                'disagreements': list(self._disagreements)
+            }
+
+        latency: Dict[str, Optional[float]] = dict.fromkeys(['mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'])
+        if latencies.size:
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            latency = {
+                'mean_ms': float(latencies.mean()),
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'p99_ms': float(p99),
+                'max_ms': float(latencies.max())
+            }
+        stats['latency'] = latency
+        return stats
@@ -0,0 +1,214 @@
+"""
+Closed-loop HTTP load generator for the AI Doctor API.
+
+Each of N workers sends its next request as soon as the previous one has
+answered, for every concurrency level of the sweep. Requests are replayed
+from a JSONL log or synthesized from the symptom sets in symptoms_df.csv.
+
+Log lines look like:
+    {"method": "POST", "path": "/api/v1/predict/", "json": {"symptoms": ["itching"]}}
+An optional "endpoint" field sets the label results are grouped under;
+it defaults to the method and path.
+
+Usage:
+    python load_test.py                                  # in-process, synthesized traffic
+    python load_test.py --url http://localhost:8000      # against a running server
+    python load_test.py --log requests.jsonl --concurrency 1,8,32 --output run.json
+"""
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import logging
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+API_PREFIX = "/api/v1/predict"
+
+# The app configures INFO logging on import; per-request httpx log lines
+# would otherwise be written inside the timed loop
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def load_request_log(log_path: Path) -> List[Dict[str, Any]]:
+    """Read a JSONL request log, skipping blank lines"""
+    workload = []
+    with open(log_path) as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "path" not in entry:
+                raise ValueError(f"{log_path}:{line_no}: request has no 'path'")
+            method = entry.get("method", "GET").upper()
+            workload.append({
+                "endpoint": entry.get("endpoint", f"{method} {entry['path'].split('?')[0]}"),
+                "method": method,
+                "path": entry["path"],
+                "json": entry.get("json")
+            })
+    return workload
+
+
+def synthesize_requests(symptoms_csv: Path) -> List[Dict[str, Any]]:
+    """Build predict and ask-next requests from the symptom sets in symptoms_df.csv"""
+    symptoms_df = pd.read_csv(symptoms_csv)
+    symptom_cols = [col for col in symptoms_df.columns if col.startswith("Symptom_")]
+    workload = []
+    for row in symptoms_df[symptom_cols].itertuples(index=False):
+        # Match the vocabulary the API derives from the training.csv headers
+        symptoms = [s.strip().replace("_", " ") for s in row if isinstance(s, str) and s.strip()]
+        if not symptoms:
+            continue
+        workload.append({
+            "endpoint": f"POST {API_PREFIX}/",
+            "method": "POST",
+            "path": f"{API_PREFIX}/",
+            "json": {"symptoms": symptoms}
+        })
+        workload.append({
+            "endpoint": f"POST {API_PREFIX}/ask-next",
+            "method": "POST",
+            "path": f"{API_PREFIX}/ask-next",
+            "json": {"symptoms": symptoms[:2]}
+        })
+    return workload
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Reduce raw latencies (seconds) to throughput and percentile figures"""
+    if not latencies:
+        return {"requests": 0, "errors": errors, "throughput_rps": 0.0,
+                "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3)
+    }
+
+
+async def run_level(client: httpx.AsyncClient, workload: List[Dict[str, Any]],
+                    concurrency: int, duration: float, warmup: float) -> Dict[str, Any]:
+    """Drive one concurrency level and return its per-endpoint summary"""
+    requests = itertools.cycle(workload)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            request = next(requests)
+            sent = time.perf_counter()
+            try:
+                response = await client.request(request["method"], request["path"], json=request["json"])
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            done = time.perf_counter()
+            if sent < measure_from:
+                continue
+            latencies[request["endpoint"]].append(done - sent)
+            if failed:
+                errors[request["endpoint"]] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - measure_from
+
+    all_latencies = [latency for values in latencies.values() for latency in values]
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "total": summarize(all_latencies, sum(errors.values()), elapsed),
+        "endpoints": {
+            endpoint: summarize(latencies[endpoint], errors[endpoint], elapsed)
+            for endpoint in sorted(latencies)
+        }
+    }
+
+
+def make_client(url: Optional[str], app_path: str) -> httpx.AsyncClient:
+    """Create a client for a running server, or for the app in-process"""
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=30.0)
+    module_name, app_name = app_path.split(":")
+    app = getattr(importlib.import_module(module_name), app_name)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                             base_url="http://loadtest", timeout=30.0)
+
+
+def print_report(report: Dict[str, Any]):
+    """Print a human-readable table of the sweep"""
+    header = f"{'conc':>5}  {'endpoint':<40} {'reqs':>7} {'errs':>5} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    print(f"Target: {report['target']}  ({report['workload_size']} distinct requests)")
+    print(header)
+    print("-" * len(header))
+    for level in report["levels"]:
+        rows = list(level["endpoints"].items()) + [("TOTAL", level["total"])]
+        for endpoint, stats in rows:
+            if stats["requests"] == 0:
+                continue
+            print(f"{level['concurrency']:>5}  {endpoint[:40]:<40} {stats['requests']:>7} {stats['errors']:>5} "
+                  f"{stats['throughput_rps']:>9.1f} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.log:
+        workload = load_request_log(args.log)
+        if not workload:
+            raise SystemExit(f"No requests found in {args.log}")
+    else:
+        workload = synthesize_requests(args.symptoms_csv)
+
+    report = {
+        "target": args.url or f"in-process {args.app}",
+        "workload": str(args.log) if args.log else f"synthesized from {args.symptoms_csv}",
+        "workload_size": len(workload),
+        "levels": []
+    }
+    async with make_client(args.url, args.app) as client:
+        for concurrency in args.concurrency:
+            report["levels"].append(
+                await run_level(client, workload, concurrency, args.duration, args.warmup)
+            )
+    return report
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Closed-loop load generator for the AI Doctor API")
+    parser.add_argument("--url", help="Base URL of a running server; runs the app in-process when omitted")
+    parser.add_argument("--app", default="backend.app.main:app", help="ASGI app to load in-process (module:attribute)")
+    parser.add_argument("--log", type=Path, help="JSONL request log to replay")
+    parser.add_argument("--symptoms-csv", type=Path, default=Path(__file__).parent / "Data.csv" / "symptoms_df.csv",
+                        help="Source of synthesized symptom sets when no log is given")
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 4, 16],
+                        help="Comma-separated concurrency levels to sweep")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Unmeasured seconds before each level")
+    parser.add_argument("--output", type=Path, help="Write the machine-readable JSON report to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nReport written to {args.output}")